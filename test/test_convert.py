@@ -194,6 +194,11 @@ class TestConvert(unittest.TestCase):
         # and commonly passed as just the date without the time
         # note: stripping the time part using the date() method for comparison
         self.assertEqual(date.date(), convert.to_date("20240131").date())
+        # the compact form can also carry fractional seconds and a utc offset
+        self.assertEqual(date.replace(microsecond=500000), convert.from_iso8601_compact("20240131T081030.5"))
+        self.assertEqual(date, convert.from_iso8601_compact("20240131T081030.0+0000"))
+        with self.assertRaises(ValueError):
+            convert.from_iso8601_compact("2024.01.31")
         # bug fix: if a datetime is passed we get exception because datetime.fromisoformat(value) expects str only
         # we should just return the original value instead adding conditional to only alter if type str
         utc_now_tz = utc_now.replace(tzinfo=timezone.utc)
@@ -1,9 +1,13 @@
+import copy
 import unittest
 from contextlib import redirect_stdout
 from io import StringIO
 
 from ubercode.utils.urls import ParsedUrl
 from ubercode.utils.urls import ParsedQueryString
+from ubercode.utils.urls import ParsedUrlError
+from ubercode.utils.urls import _urlsplit
+from urllib.parse import urlsplit
 
 
 class TestUrls(unittest.TestCase):
@@ -49,6 +53,25 @@ class TestUrls(unittest.TestCase):
         parsed_url = ParsedUrl(test_uri, default_scheme='http', default_netloc='localhost:8000', default_filepath='/booger/')
         self.assertEqual("tel", str(parsed_url.scheme))
         self.assertEqual(test_uri, parsed_url.url)
+        # like urllib, bytes urls are accepted and give bytes back
+        parsed_url = ParsedUrl(b"http://ex.org/a.html?x=1")
+        self.assertEqual(b"http://ex.org/a.html?x=1", parsed_url.url)
+        self.assertEqual(b"ex.org", parsed_url.netloc)
+        self.assertEqual((b"/", b"a.html", b".html"), (parsed_url.filepath, parsed_url.filename, parsed_url.fileext))
+        # missing or empty urls can't be parsed; the error is a ValueError so it can be caught like other bad values
+        for test_uri in [None, "", "   "]:
+            with self.assertRaises(ParsedUrlError):
+                ParsedUrl(test_uri)
+        with self.assertRaises(ValueError):
+            ParsedUrl("")
+        # parsing is cached; make sure changing one url doesn't change another parsed from the same values
+        test_uri = "/test/index.html?x=1"
+        parsed_url = ParsedUrl(test_uri, default_netloc='ex.org')
+        parsed_url2 = ParsedUrl(test_uri, default_netloc='ex.org')
+        parsed_url.domain = "qa.ex.org"
+        parsed_url.set_param("x", 2)
+        self.assertEqual("//qa.ex.org/test/index.html?x=2", str(parsed_url))
+        self.assertEqual("//ex.org/test/index.html?x=1", str(parsed_url2))
 
 
     # --- basic retrieval
@@ -84,6 +107,12 @@ class TestUrls(unittest.TestCase):
         self.assertEqual("index.html", parsed_url.filename)
         self.assertEqual("/test", parsed_url.filepath)
         self.assertEqual("/test/index.html", parsed_url.path)
+        # they follow the path if it changes and treat dot files and folders like os.path does
+        parsed_url.path = "/test/.htaccess"
+        self.assertEqual(("/test", ".htaccess", ""), (parsed_url.filepath, parsed_url.filename, parsed_url.fileext))
+        parsed_url.path = "/test/docs/"
+        self.assertEqual(("/test/docs", "", ""), (parsed_url.filepath, parsed_url.filename, parsed_url.fileext))
+        parsed_url.path = "/test/index.html"
         # base url is the url without any querystring or fragments
         self.assertEqual("//test.local.net:8000/test/index.html", parsed_url.base)
         # (site) relative url is url with querystring and fragments but no scheme or netloc
@@ -93,18 +122,41 @@ class TestUrls(unittest.TestCase):
         # allow fully replacing the querystring and fragment which isn't allowed in urllib
         parsed_url.qs = "z=1&u=3"
         self.assertEqual("//test.local.net:8000/test/index.html?z=1&u=3#test", str(parsed_url))
+        # values worked out before the change (like rel above) are worked out again after it
+        self.assertEqual("/test/index.html?z=1&u=3#test", parsed_url.rel)
         parsed_url.fragment = "test2"
         self.assertEqual("//test.local.net:8000/test/index.html?z=1&u=3#test2", str(parsed_url))
         # it is very handy to change just one parameter instead of the whole qs
         # test setParam will add if not there
         parsed_url.set_param("v", 4)
         self.assertEqual("//test.local.net:8000/test/index.html?z=1&u=3&v=4#test2", str(parsed_url))
+        # params are read back the same as if they were parsed from the url
+        self.assertEqual("4", parsed_url.get_param("v"))
         # test updates if there
         parsed_url.set_param("u", "2")
         self.assertEqual("//test.local.net:8000/test/index.html?z=1&u=2&v=4#test2", str(parsed_url))
         # test removing a param
         parsed_url.del_param("u")
         self.assertEqual("//test.local.net:8000/test/index.html?z=1&v=4#test2", str(parsed_url))
+        # a param that can't be set doesn't leave anything behind
+        with self.assertRaises(TypeError):
+            parsed_url.set_param(1, "x")
+        self.assertEqual(None, parsed_url.get_param(1))
+        parsed_url.set_param("b", "2")
+        self.assertEqual("//test.local.net:8000/test/index.html?z=1&v=4&b=2#test2", str(parsed_url))
+        parsed_url.del_param("b")
+        self.assertEqual("//test.local.net:8000/test/index.html?z=1&v=4#test2", str(parsed_url))
+        # a copy can change its params without changing the original (ex: pagination links from a base url)
+        base_url = ParsedUrl("http://ex.org/list?page=1&q=x")
+        self.assertEqual("x", base_url.get_param("q"))
+        page_url = copy.copy(base_url)
+        page_url.set_param("page", 2)
+        page_url.del_param("q")
+        self.assertEqual("http://ex.org/list?page=2", str(page_url))
+        self.assertEqual("1", base_url.get_param("page"))
+        self.assertEqual("x", base_url.get_param("q"))
+        base_url.set_param("q", "y")
+        self.assertEqual("http://ex.org/list?page=1&q=y", str(base_url))
 
         # bugfix #1: test that we don't truncate data if there is an = in the data
         test_qs = "id=1&b=2&x=1234=56&z=3"
@@ -134,6 +186,22 @@ class TestUrls(unittest.TestCase):
                                default_filepath="/blog/")
         self.assertEqual(parsed_url.url, "http://localhost:8000/blog/")
 
+    # --- fast url splitting
+    # ----------------------
+    def test_urlsplit(self):
+        # the regex split for plain web urls must give exactly what urllib does (which handles everything else)
+        for test_uri in ["1.jpg", "/?id=1&b=2", "//ex.org/?id=1&b=2", "https://ex.org:8000/a/b.html?x=1#y", "a#b?c",
+                         "../products/", "?", "#", "http:8000", "https:8000", "HTTP://ex.org/", "mailto:me@mail.com?subject=x",
+                         "tel: 222.222.2222", "http://[::1]:80/", " //ex.org/", "/a\tb"]:
+            self.assertEqual(urlsplit(test_uri), _urlsplit(test_uri))
+            # note: urlsplit also cleans up the default scheme so it has to match with a messy one too
+            for scheme in ["https", " http", "https\n"]:
+                self.assertEqual(urlsplit(test_uri, scheme), _urlsplit(test_uri, scheme))
+            self.assertEqual(urlsplit(test_uri, allow_fragments=False), _urlsplit(test_uri, allow_fragments=False))
+        # a default scheme read from a config file with a newline still gives a good url
+        self.assertEqual("https://ex.org/a", ParsedUrl("//ex.org/a", default_scheme="https\n").url)
+        self.assertEqual("http://ex.org/a", ParsedUrl("/a", default_scheme=" http", default_netloc="ex.org").url)
+
 
 if __name__ == '__main__':
     unittest.main()
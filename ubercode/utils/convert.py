@@ -10,6 +10,14 @@ from pprint import pprint
 # NOTE: we will assume a to_lower conversion
 TRUE_VALUES = [True, 1, "1", "y", "t", "true", "yes", "on"]
 FALSE_VALUES = [None, False, 0, "0", "n", "f", "false", "no", "off"]
+# colons and dashes to remove from an iso8601 timestamp EXCEPT for the dash indicating + or - utc offset
+#   NOTE: compiled once here since from_iso8601_compact is usually called for every row of a dataset
+ISO8601_COMPACT_STRIP = re.compile(r"[:]|([-](?!((\d{2}[:]\d{2})|(\d{4}))$))")
+# strptime patterns for the compact iso8601 form (in order of preference) grouped by the only shape each can match
+#   NOTE: strptime matches literals ignoring case so a time part can be marked with T or t
+ISO8601_COMPACT_FRACTION_PATTERNS = ("%Y%m%dT%H%M%S.%f%z", "%Y%m%dT%H%M%S.%f")
+ISO8601_COMPACT_TIME_PATTERNS = ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M", "%Y%m%dT%H")
+ISO8601_COMPACT_DATE_PATTERNS = ("%Y%m%d",)
 
 
 # -------- helper utilities ----------
@@ -175,27 +183,22 @@ def from_iso8601_compact(value: Any = None, tz: timezone = timezone.utc):
         if len(value.strip()) == 0:
             return None
         # remove colons and dashes EXCEPT for the dash indicating + or - utc offset for the timezone
-        conformed_timestamp = re.sub(r"[:]|([-](?!((\d{2}[:]\d{2})|(\d{4}))$))", "", value)
-        _value = None
-        try:
-            _value = datetime.strptime(conformed_timestamp, "%Y%m%dT%H%M%S.%f%z")
-        except ValueError:
+        conformed_timestamp = ISO8601_COMPACT_STRIP.sub("", value)
+        # only try the patterns that could match; a fraction needs the . and any time part needs the T
+        if "." in conformed_timestamp:
+            patterns = ISO8601_COMPACT_FRACTION_PATTERNS
+        elif "T" in conformed_timestamp or "t" in conformed_timestamp:
+            patterns = ISO8601_COMPACT_TIME_PATTERNS
+        else:
+            patterns = ISO8601_COMPACT_DATE_PATTERNS
+        for pattern in patterns:
             try:
-                _value = datetime.strptime(conformed_timestamp, "%Y%m%dT%H%M%S.%f")
+                _value = datetime.strptime(conformed_timestamp, pattern)
+                break
             except ValueError:
-                try:
-                    _value = datetime.strptime(conformed_timestamp, "%Y%m%dT%H%M%S")
-                except ValueError:
-                    try:
-                        _value = datetime.strptime(conformed_timestamp, "%Y%m%dT%H%M")
-                    except ValueError:
-                        try:
-                            _value = datetime.strptime(conformed_timestamp, "%Y%m%dT%H")
-                        except ValueError:
-                            try:
-                                _value = datetime.strptime(conformed_timestamp, "%Y%m%d")
-                            except ValueError:
-                                raise ValueError(f"DateTime string [{value}] did not match an expected pattern.")
+                pass
+        else:
+            raise ValueError(f"DateTime string [{value}] did not match an expected pattern.")
     if tz and isinstance(_value, datetime) and not _value.tzinfo:
         _value = _value.replace(tzinfo=tz)
     return _value
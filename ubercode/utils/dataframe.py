@@ -1,15 +1,17 @@
 """ common utilities for working with dataframes"""
 from typing import Any
-from . import logging
+from .logging import ColorLogger
 
 
 # extend the logging to include log.dataframe()
 # NOTE: making dataframe type Any, so we don't have to include pandas but intended use is dataframe
 # todo: decide if better to include in different install requiring pandas like the requests utils version
-class DataframeLogger(logging.ColorLogger):
+class DataframeLogger(ColorLogger):
     def dataframe(self, dataframe: Any,  label: str = None, color: str = "INFO", df_color: str = "ALWAYS") -> None:
-        color = DataframeLogger.DEFAULT_COLOR_MAP.get(color, DataframeLogger.DEFAULT_COLOR_MAP["INFO"])
-        df_color = DataframeLogger.DEFAULT_COLOR_MAP.get(df_color, DataframeLogger.DEFAULT_COLOR_MAP["ALWAYS"])
+        # look the map up once; it is not cached on the module since it can be replaced after creation
+        color_map = DataframeLogger.DEFAULT_COLOR_MAP
+        color = color_map.get(color, color_map["INFO"])
+        df_color = color_map.get(df_color, color_map["ALWAYS"])
         if label:
             self.always(label, color=color)
         # print(dataframe)
@@ -1,34 +1,42 @@
+import copy
 import os
-from urllib.parse import urlsplit
-from ubercode.utils.convert import to_str
-from pathlib import PurePath
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, SplitResult
+
+# the uri splitting regex from RFC-3986 appendix B: scheme, netloc, path, query, fragment
+RFC3986_URI = re.compile(r"^(?:([^:/?#]+):)?(?://([^/?#]*))?([^?#]*)(?:\?([^#]*))?(?:#(.*))?$")
+# schemes the ParsedUrl defaults apply to; no scheme means a relative web url
+WEB_SCHEMES = frozenset(("http", "https"))
+WEB_SCHEMES_OR_RELATIVE = frozenset(("http", "https", ""))
+
+
+class ParsedUrlError(ValueError):
+    """
+    Raised when ParsedUrl is given a url it can't parse (ex: None or empty after filtering)
+    """
+    pass
 
 
 class ParsedQueryString:
     """
     Encapsulates the parsing and setting of query string parameters
     """
+    __slots__ = ('original_qs', 'qs', 'params')
+
     def __init__(self, query_string):
         self.original_qs = query_string
         self.qs = query_string.strip()
         # strip off the ? if still there
         if self.qs.startswith("?"):
             self.qs = self.qs[1:]
-        # split each param based on & (should be x=xval, y=yval etc)
-        exp_params = self.qs.split("&")
         self.params = {}
-        for exp_param in exp_params:
-            param = to_str(exp_param)
-            key = ""
-            value = ""
-            pos = param.find("=")
-            if pos > -1:
-                key = param[:pos]
-                if len(param) > pos + 1:
-                    value = param[pos + 1:]
-            else:
-                if param:
-                    key = param
+        if not self.qs:
+            return
+        # split each param based on & (should be x=xval, y=yval etc)
+        for param in self.qs.split("&"):
+            # note: only split on the first = since the value can have one too (bugfix #1); no = gives an empty value
+            key, _, value = param.partition("=")
             if key:
                 self.params[key] = value
 
@@ -37,12 +45,107 @@ class ParsedQueryString:
         By default, the query string will be the params dict put back together without the ?
         :return:
         """
-        qs = ""
-        for key, value in self.params.items():
-            qs += key + "=" + str(value) + "&"
-        if qs:
-            qs = qs[:-1]
-        return qs
+        return "&".join(key + "=" + str(value) for key, value in self.params.items())
+
+
+def _urlsplit(url: str, scheme: str = "", allow_fragments: bool = True) -> SplitResult:
+    """
+    Same result as urllib.parse.urlsplit but uses the RFC-3986 regex for plain web urls which is about twice as fast.
+    Anything urlsplit would clean up or validate (other schemes, whitespace/control or non-ascii chars, ipv6 hosts)
+    still goes through urlsplit, as does any default scheme other than http or https since urlsplit cleans that up too
+    (ex: a trailing newline from a config file).
+    NOTE: python 3.8 reads https:<digits> as a path with a port instead of a scheme so that goes through urlsplit too
+    """
+    if isinstance(url, str) and allow_fragments and (not scheme or scheme in WEB_SCHEMES) \
+            and url.isascii() and url.isprintable() and not url.startswith(" "):
+        url_scheme, netloc, path, query, fragment = RFC3986_URI.match(url).groups()
+        if (url_scheme is None or url_scheme == "http" or (url_scheme == "https" and not url[6:].isdigit())) \
+                and (netloc is None or ("[" not in netloc and "]" not in netloc)):
+            return SplitResult(url_scheme or scheme, netloc or "", path, query or "", fragment or "")
+    return urlsplit(url, scheme, allow_fragments=allow_fragments)
+
+
+def _split_path(path: str):
+    """
+    Split a url path into its filepath, filename and fileext in one go
+    NOTE: gives the same results as os.path dirname, basename and splitext do for posix paths
+    :return: tuple of (filepath, filename, fileext)
+    """
+    if not isinstance(path, str):
+        # bytes urls; let os.path deal with them
+        filename = os.path.basename(path)
+        return os.path.dirname(path), filename, os.path.splitext(filename)[1]
+    pos = path.rfind("/") + 1
+    filepath, filename = path[:pos], path[pos:]
+    # like dirname we drop the trailing slashes unless the slashes are all we have
+    if filepath and filepath != "/" * len(filepath):
+        filepath = filepath.rstrip("/")
+    # like splitext leading dots don't start an extension (ex: .htaccess)
+    pos = filename.rfind(".")
+    fileext = filename[pos:] if pos > 0 and filename[:pos].lstrip(".") else ""
+    return filepath, filename, fileext
+
+
+def _join_path(parent: str, path: str) -> str:
+    """
+    Join a path onto a parent path; same result as str(PurePosixPath(parent, path)) without building the path objects
+    NOTE: like PurePath an absolute path replaces the parent and empty or . parts are dropped (ex: /blog + ./x/ -> /blog/x)
+    :return: joined path
+    """
+    # the root comes from the parent unless the path is absolute itself
+    anchor = path
+    if parent and not path.startswith("/"):
+        anchor = parent
+        path = parent + "/" + path
+    root = ""
+    if anchor.startswith("/"):
+        # posix keeps exactly 2 leading slashes but any other number means root
+        root = "//" if anchor.startswith("//") and not anchor.startswith("///") else "/"
+    return root + "/".join(part for part in path.split("/") if part and part != ".") or "."
+
+
+@lru_cache(maxsize=4096)
+def _parse_url(url: str, default_netloc: str = None, default_scheme: str = None, default_filepath: str = None,
+               allow_fragments: bool = True, symlinks=False):
+    """
+    Split an (already filtered) url and apply the ParsedUrl defaults to it.
+    NOTE: the same urls and defaults are parsed over and over (links on a page, sitemaps etc.) so results are cached;
+        this is safe because SplitResult is immutable and ParsedUrl replaces it on any change instead of altering it
+    :return: urllib SplitResult with the defaults applied
+    """
+    parsed = _urlsplit(url, default_scheme or "", allow_fragments=allow_fragments)
+    # none of the defaults apply to opaque links like mailto: or tel: so don't bother checking them
+    if parsed.scheme not in WEB_SCHEMES_OR_RELATIVE:
+        return parsed
+    # same for urls that already have a domain (and scheme if we would give them one) unless we have a filepath to add
+    if parsed.netloc and (parsed.scheme or not default_scheme) and not default_filepath:
+        return parsed
+    # note: working on the parts and putting them back once at the end so we only build one new SplitResult
+    scheme, netloc, path = parsed.scheme, parsed.netloc, parsed.path
+    if default_scheme and not scheme and netloc:
+        scheme = default_scheme
+    if default_netloc and not netloc and scheme in WEB_SCHEMES_OR_RELATIVE:
+        netloc = default_netloc
+    if default_filepath and default_filepath not in os.path.dirname(path) and scheme in WEB_SCHEMES_OR_RELATIVE:
+        # we have a parent path we need to append to the existing one
+        new_path = _join_path(default_filepath, path)
+        # note: I don't want .. since this is web urls; using normpath to remove them unless symlinks is true
+        if not symlinks and '..' in new_path:
+            new_path = os.path.normpath(new_path)
+        # joining always strips the last slash.  If we had a path before appending lets add it back
+        if path.endswith('/') and not new_path.endswith('/'):
+            new_path += '/'
+        # if we only have the default path make sure we have a slash (since we know it is a path)
+        #   note: joining will strip it off even if we send it
+        if new_path.endswith(default_filepath) or new_path.endswith(default_filepath[:-1]) and not new_path.endswith('/'):
+            new_path += '/'
+        path = new_path
+    # one last correction; if we have a scheme but no netloc lets omit the scheme so it doesn't give bad results
+    if not netloc and scheme in WEB_SCHEMES:
+        scheme = ''
+    if scheme != parsed.scheme or netloc != parsed.netloc or path != parsed.path:
+        parsed = parsed._replace(scheme=scheme, netloc=netloc, path=path)
+    return parsed
 
 
 class ParsedUrl:
@@ -57,62 +160,65 @@ class ParsedUrl:
 
         We want a way to ask for a relative or fully qualified url including fragments and querystings or not
     """
+    # note: lots of these get created (every link on a page) so no per instance __dict__
+    __slots__ = ('original_url', 'parsed', '_qs_cache', '_qs_cache_key', '_path_parts', '_path_parts_key',
+                 '_derived', '_derived_key')
+
     def __init__(self, url: str, default_netloc: str = None, default_scheme: str = None,
                  default_filepath: str = None, allow_fragments: bool = True, symlinks=False):
         self.original_url = url
-        if self.url_filter(url) is None or len(self.url_filter(url)) == 0:
-            raise Exception(
-                f'Attempted to parse [{str(self.url_filter(url))}].  Url parameter must exist and be a relative or absolute url after filtering!')
-        self.parsed = urlsplit(self.url_filter(url), default_scheme or "", allow_fragments=allow_fragments)
-        if default_scheme and not self.parsed.scheme and self.netloc:
-            self.scheme = default_scheme
-        if default_netloc and not self.parsed.netloc and self.scheme in ["http", "https", ""]:
-            self.netloc = default_netloc
-        if default_filepath and default_filepath not in self.filepath and self.scheme in ["http", "https", ""]:
-            # we have a parent path we need to append to the existing one
-            new_path = str(PurePath(default_filepath, self.path))
-            # note: I don't want .. since this is web urls; using normpath to remove them unless symlinks is true
-            if not symlinks and '..' in new_path:
-                new_path = os.path.normpath(new_path)
-            # PurePath always strips the last path.  If we had a path before appending lets add it back
-            if self.path.endswith('/') and not new_path.endswith('/'):
-                new_path += '/'
-            # if we only have the default path make sure we have a slash (since we know it is a path)
-            #   note: PurePath will strip it off even if we send it
-            if new_path.endswith(default_filepath) or new_path.endswith(default_filepath[:-1]) and not new_path.endswith('/'):
-                new_path += '/'
-            self.path = new_path
-        # one last correction; if we have a scheme but no netloc lets omit the scheme so it doesn't give bad results
-        if not self.parsed.netloc and self.parsed.scheme and self.parsed.scheme in ['http', 'https']:
-            self.parsed = self.parsed._replace(scheme='')
+        # the last parsed query string so parameter changes don't have to re-parse it every time
+        self._qs_cache = None
+        self._qs_cache_key = None
+        # the last split of the path into filepath, filename and fileext
+        self._path_parts = None
+        self._path_parts_key = None
+        # the url values worked out from parsed (url, base etc.) so reading them again is free
+        self._derived = None
+        self._derived_key = None
+        filtered_url = self.url_filter(url)
+        if not filtered_url:
+            raise ParsedUrlError(
+                f'Attempted to parse [{str(filtered_url)}].  Url parameter must exist and be a relative or absolute url after filtering!')
+        self.parsed = _parse_url(filtered_url, default_netloc, default_scheme, default_filepath,
+                                 allow_fragments, symlinks)
 
     @property
     def filepath(self):
-        return os.path.dirname(self.parsed.path)
+        return self._get_path_parts()[0]
 
     @property
     def filename(self):
-        return os.path.basename(self.parsed.path)
+        return self._get_path_parts()[1]
 
     @property
     def fileext(self):
-        return os.path.splitext(self.filename)[1]
+        return self._get_path_parts()[2]
 
     @property
     def url(self):
         # NOTE: since we are joining and applying filters in the constructor we just return the value here
         #   no setter needed to force constructor only
-        return self.parsed.geturl()
+        derived = self._get_derived()
+        if "url" not in derived:
+            derived["url"] = self.parsed.geturl()
+        return derived["url"]
 
     @property
     def base(self):
         # NOTE: url_base is always the current parsed minus any qs or fragment values
-        return self.parsed._replace(query='', fragment='').geturl()
+        derived = self._get_derived()
+        if "base" not in derived:
+            derived["base"] = self.parsed._replace(query='', fragment='').geturl()
+        return derived["base"]
 
     @property
     def rel(self):
         # NOTE: url_rel is the current parsed minus any scheme or domain
-        return self.parsed._replace(netloc='', scheme='').geturl()
+        derived = self._get_derived()
+        if "rel" not in derived:
+            derived["rel"] = self.parsed._replace(netloc='', scheme='').geturl()
+        return derived["rel"]
 
     @property
     def port(self):
@@ -172,31 +278,93 @@ class ParsedUrl:
 
     @property
     def root_domain(self):
-        domain = self.domain
-        if domain:
-            pos = domain.rfind(".")
-            if pos > -1:
-                pos = domain.rfind(".", 0, pos)
-                if pos > -1:
-                    return domain[pos + 1:]
-        return domain
+        derived = self._get_derived()
+        if "root_domain" not in derived:
+            domain = self.domain
+            if domain:
+                # keep the last 2 parts if we have more than that (ex: www.ex.org -> ex.org)
+                head, dot, last = domain.rpartition(".")
+                if dot:
+                    _, dot, middle = head.rpartition(".")
+                    if dot:
+                        domain = middle + "." + last
+            derived["root_domain"] = domain
+        return derived["root_domain"]
 
     def get_param(self, key):
-        pqs = ParsedQueryString(self.qs)
+        pqs = self._get_pqs()
         return pqs.params.get(key, None)
 
     def set_param(self, key, value):
         # first load our existing params so we replace if it exists
-        pqs = ParsedQueryString(self.qs)
+        pqs = self._copy_pqs()
+        # note: stored as the string it will be read back as from the query string
+        value = str(value)
+        safe = bool(key) and "&" not in key and "=" not in key and "&" not in value
         pqs.params[key] = value
-        self.parsed = self.parsed._replace(query=str(pqs))
+        self._set_pqs(pqs, safe=safe)
 
     def del_param(self, key):
         # first load our existing params so we replace if it exists
-        pqs = ParsedQueryString(self.qs)
+        pqs = self._copy_pqs()
         if key in pqs.params:
             pqs.params.pop(key)
-        self.parsed = self.parsed._replace(query=str(pqs))
+        self._set_pqs(pqs)
+
+    def _get_derived(self):
+        """
+        The values already worked out (url, base etc.) for the current parsed url; every change replaces parsed
+        so we start over whenever it isn't the one they were worked out from
+        :return: dict of derived values by property name
+        """
+        if self._derived_key is not self.parsed:
+            self._derived = {}
+            self._derived_key = self.parsed
+        return self._derived
+
+    def _get_path_parts(self):
+        """
+        The (filepath, filename, fileext) for the current path; only split again if the path was changed since last time
+        :return: tuple of (filepath, filename, fileext)
+        """
+        path = self.parsed.path
+        if self._path_parts_key is not path:
+            self._path_parts = _split_path(path)
+            self._path_parts_key = path
+        return self._path_parts
+
+    def _get_pqs(self):
+        """
+        The parsed query string for the current query; only re-parsed if the query was changed since last time
+        :return: ParsedQueryString
+        """
+        query = self.parsed.query
+        if self._qs_cache_key is not query:
+            self._qs_cache = ParsedQueryString(query)
+            self._qs_cache_key = query
+        return self._qs_cache
+
+    def _copy_pqs(self):
+        """
+        A copy of the parsed query string we can change; the cached one is never changed in place since a copy of this
+        ParsedUrl (ex: copy.copy for pagination links) shares it
+        :return: ParsedQueryString
+        """
+        pqs = copy.copy(self._get_pqs())
+        pqs.params = dict(pqs.params)
+        return pqs
+
+    def _set_pqs(self, pqs, safe=True):
+        """
+        Put the changed params back into the query and keep them for the next call
+        :param pqs: ParsedQueryString with the changed params
+        :param safe: False if parsing the new query would not give us the same params back (ex: an & in a value)
+        """
+        query = str(pqs)
+        self.parsed = self.parsed._replace(query=query)
+        self._qs_cache = pqs
+        # note: parsing strips whitespace and a leading ? from the whole query so those would not round trip either
+        self._qs_cache_key = query if safe and not query.startswith("?") and query.strip() == query else None
 
     @staticmethod
     def url_filter(url):
@@ -217,7 +385,10 @@ class ParsedUrl:
         return self.url
 
 
-if __name__ == "__main__":
+def _demo():
+    """
+    Prints a few example urls; run this module directly to see them
+    """
     # test_uri = "http://localhost:8000/test1/?id=1&x=2"
     # parsed_url = ParsedUrl(test_uri)
     # print(f"root domain [{test_uri}]: {parsed_url.get_root_domain()}")
@@ -250,4 +421,36 @@ if __name__ == "__main__":
     # # test mailto links
     test_uri = 'mailto:me@mail.com?subject=mysubject&body=mybody'
     purl = ParsedUrl(test_uri, default_scheme='http', default_netloc='localhost:8000')
-    print(purl)
\ No newline at end of file
+    print(purl)
+
+
+def _bench(n: int = 100000):
+    """
+    Rough timings for a few typical urls so changes to the parsing can be compared; run this module directly to see them
+    :param n: number of times to parse each url
+    """
+    # note: only imported here so using the module doesn't pay for the bench
+    import time
+    urls = [
+        ("http://www.ex.org/test/index.html?x=1&y=2#test", {}),
+        ("1.jpg", {"default_scheme": "http", "default_netloc": "ex.org", "default_filepath": "/mdb"}),
+        ("/?id=1&b=&c=3", {"default_netloc": "ex.org"}),
+        ("mailto:me@mail.com?subject=mysubject&body=mybody", {"default_scheme": "http", "default_netloc": "ex.org"}),
+    ]
+    for url, defaults in urls:
+        # ParsedUrl as it is normally used (the same url parsed again comes from the cache)
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            ParsedUrl(url, **defaults)
+        cached = (time.perf_counter_ns() - start) / n
+        # the parsing itself without the cache
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            _parse_url.__wrapped__(url, **defaults)
+        uncached = (time.perf_counter_ns() - start) / n
+        print(f"{url}: ParsedUrl {cached:.0f} ns, uncached parse {uncached:.0f} ns")
+
+
+if __name__ == "__main__":
+    _demo()
+    _bench()